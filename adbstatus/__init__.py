@@ -1,35 +1,72 @@
 """ADB Status - Android Debug Bridge (ADB) device monitor with sleep/wake support."""
 
+import functools
 import sys
 from pathlib import Path
-import tomllib
 
-# Reset version variables
-__version__ = None
-__author__ = None
-__email__ = None
-__version_info__ = None
+# Package metadata attributes, loaded on first access via __getattr__
+_METADATA_ATTRS = ('__version__', '__version_info__', '__author__', '__email__')
 
-for path in [
-    Path(__file__).parent.parent / "pyproject.toml",  # Development location
-    Path(__file__).parent / "pyproject.toml",  # Copied during install
-]:
-    if path.exists():
-        try:
-            with open(path, "rb") as f:
-                pyproject = tomllib.load(f)
-                __version__ = pyproject["project"]["version"]
-                __version_info__ = tuple(int(part) for part in __version__.split('.') if part.isdigit())
-                __author__ = pyproject["project"]["authors"][0].get("name")
-                __email__ = pyproject["project"]["authors"][0].get("email")
+@functools.lru_cache(maxsize=1)
+def _load_metadata():
+    """Load package metadata from pyproject.toml or the installed distribution.
+
+    This is deferred until metadata is actually needed, so that commands
+    which never print a version don't pay for parsing TOML at import time.
+
+    Returns:
+        dict: Values for each of the package metadata attributes.
+    """
+    for path in [
+        Path(__file__).parent.parent / "pyproject.toml",  # Development location
+        Path(__file__).parent / "pyproject.toml",  # Copied during install
+    ]:
+        if path.exists():
+            try:
+                import tomllib
+                with open(path, "rb") as f:
+                    project = tomllib.load(f)["project"]
+                version = project["version"]
+                author = project["authors"][0].get("name")
+                email = project["authors"][0].get("email")
                 break
-        except Exception as e:
-            sys.stderr.write(f"Error: Could not load package metadata from {path}: {e}\n")
-            sys.exit(1)
+            except Exception as e:
+                sys.stderr.write(f"Error: Could not load package metadata from {path}: {e}\n")
+                sys.exit(1)
+    else:
+        # Installed without pyproject.toml, use the distribution's metadata
+        try:
+            from email.utils import parseaddr
+            from importlib import metadata
+            dist = metadata.metadata("adbstatus")
+            version = dist["Version"]
+            author, email = parseaddr(dist["Author-email"] or "")
+        except Exception:
+            version = author = email = None
+
+    if not version or not author or not email:
+        sys.stderr.write("Error: Required metadata not found in pyproject.toml\n")
+        sys.exit(1)
+
+    return {
+        '__version__': version,
+        '__version_info__': tuple(int(part) for part in version.split('.') if part.isdigit()),
+        '__author__': author,
+        '__email__': email,
+    }
+
+def __getattr__(name):
+    """Load package metadata attributes on first access."""
+    if name in _METADATA_ATTRS:
+        return _load_metadata()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-if __version__ is None or __author__ is None or __email__ is None:
-    sys.stderr.write("Error: Required metadata not found in pyproject.toml\n")
-    sys.exit(1)
+# Version information function
+def version_info(program_name="ADBStatus"):
+    """Print version information for the program."""
+    metadata = _load_metadata()
+    print(f"{program_name} {metadata['__version__']}")
+    print(f"Author: {metadata['__author__']} <{metadata['__email__']}>")
 
 # Import all classes with their original names
 from .core import ADBStatus
@@ -45,16 +82,10 @@ Server = ADBStatusServer
 Monitor = ADBStatusMonitor
 SleepMonitor = ADBStatusSleepMonitor
 
-# Version information function
-def version_info(program_name="ADBStatus"):
-    """Print version information for the program."""
-    print(f"{program_name} {__version__}")
-    print(f"Author: {__author__} <{__email__}>")
-
 __all__ = [
     # Full names
     'ADBStatus',
-    'ADBStatusService', 
+    'ADBStatusService',
     'ADBStatusServer',
     'ADBStatusMonitor',
     'ADBStatusSleepMonitor',
@@ -66,4 +97,4 @@ __all__ = [
     'SleepMonitor',
     # Utility functions
     'version_info',
-] 
\ No newline at end of file
+]
@@ -2,12 +2,71 @@
 """ADBStatus - ADB device information class."""
 
 import argparse
+import functools
 import json
 import os
+import socket
 import subprocess
 import sys
 from . import version_info
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
+
+def json_dumps(obj, indent=False):
+    """Serialize an object to JSON, using orjson when it is installed.
+    
+    Args:
+        obj: Object to serialize.
+        indent (bool): Pretty-print with two-space indentation.
+        
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+def print_json(obj):
+    """Print an object to stdout as indented JSON.
+    
+    The encoded bytes are written straight to the stdout buffer rather than
+    being decoded for print() only to be encoded again.
+    
+    Args:
+        obj: Object to print.
+    """
+    sys.stdout.flush()
+    sys.stdout.buffer.write(json_dumps(obj, indent=True) + b'\n')
+    sys.stdout.flush()
+
+# Environment for adb and script subprocesses, snapshotted once at import
+_BASE_ENV = os.environ.copy()
+
+def refresh_env():
+    """Re-snapshot the environment used for subprocesses.
+    
+    The environment is copied once at import rather than on every subprocess
+    call. Long-running services can call this to pick up later changes.
+    """
+    global _BASE_ENV
+    _BASE_ENV = os.environ.copy()
+
+def subprocess_env(device_id=None):
+    """Get the environment for a subprocess, optionally targeting a device.
+    
+    Args:
+        device_id (str, optional): Device ID to set as ANDROID_SERIAL.
+        
+    Returns:
+        dict: Environment mapping. Only copied when a device ID is given.
+    """
+    if device_id:
+        return {**_BASE_ENV, 'ANDROID_SERIAL': device_id}
+    return _BASE_ENV
+
 class ADBStatus:
     """ADB device information class."""
     
@@ -15,6 +74,11 @@ class ADBStatus:
     def get_devices(device_id=None):
         """Get list of connected ADB devices.
         
+        Devices are queried directly from the adb server over its local socket,
+        which avoids starting an adb client process for every call. If the
+        server can't be reached, the adb command is run instead, which also
+        starts the server for subsequent calls.
+        
         Args:
             device_id (str, optional): Filter for a specific device ID.
             
@@ -22,41 +86,104 @@ class ADBStatus:
             list: List of device dictionaries with details.
         """
         try:
-            # Start with the current environment
-            env = os.environ.copy()
-            if device_id:
-                env['ANDROID_SERIAL'] = device_id
+            output = ADBStatus._query_adb_server('host:devices-l')
+        except (OSError, ValueError):
+            output = ADBStatus._run_adb_devices(device_id)
+        
+        # Copy the cached dictionaries so callers can't alter the cache
+        return [
+            dict(device) for device in ADBStatus._parse_devices(output)
+            if not device_id or device['serial'] == device_id
+        ]
+    
+    @staticmethod
+    def _query_adb_server(service):
+        """Send a host service request to the local adb server.
+        
+        Requests and replies are framed with a 4 hex digit length prefix, and
+        replies start with an OKAY or FAIL status, as described in adb's
+        protocol documentation. Only host services that return a single reply
+        (such as ``host:devices-l``) are supported.
+        
+        Args:
+            service (str): Host service to request.
             
+        Returns:
+            bytes: The server's reply.
+            
+        Raises:
+            OSError: If the server can't be reached or rejects the request.
+            ValueError: If the reply is malformed.
+        """
+        port = int(os.environ.get('ANDROID_ADB_SERVER_PORT', 5037))
+        request = service.encode('ascii')
+        
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(b'%04x' % len(request) + request)
+            with sock.makefile('rb') as reply:
+                status = reply.read(4)
+                length = int(reply.read(4), 16)
+                payload = reply.read(length)
+        
+        if status != b'OKAY':
+            raise OSError(f"adb server rejected {service}: {payload.decode('utf-8', 'replace')}")
+        return payload
+    
+    @staticmethod
+    def _run_adb_devices(device_id=None):
+        """Run ``adb devices -l`` and return its device lines.
+        
+        Args:
+            device_id (str, optional): Device ID to pass as ANDROID_SERIAL.
+            
+        Returns:
+            bytes: Raw device lines without the header, or empty on error.
+        """
+        try:
             adb_output = subprocess.run(
                 ["adb", "devices", "-l"],
-                capture_output=True, text=True,
-                env=env
+                capture_output=True,
+                env=subprocess_env(device_id)
             )
             
             # Check for errors
             if adb_output.returncode != 0:
-                return []  # Return empty list instead of failing
+                return b''  # Report no devices instead of failing
             
-            # Parse adb devices output into list of device details
-            devices = []
-            for line in adb_output.stdout.splitlines()[1:]:  # Skip first line (header)
-                if line.strip():  # Skip empty lines
-                    parts = line.split()
-                    device_info = {
-                        "serial": parts[0],
-                        "state": parts[1]
-                    }
-                    # Parse additional properties directly into top level
-                    for part in parts[2:]:
-                        if ':' in part:
-                            key, value = part.split(':', 1)
-                            device_info[key] = value
-                    devices.append(device_info)
+            return adb_output.stdout.partition(b'\n')[2]  # Skip first line (header)
+        except (OSError, subprocess.SubprocessError):
+            return b''
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _parse_devices(output):
+        """Parse ``adb devices -l`` output into device dictionaries.
+        
+        The output is kept as bytes until here and decoded in a single pass,
+        which is cheaper than decoding in the subprocess pipe or per token.
+        Results are cached by the raw output, since it is usually unchanged
+        from one query to the next.
+        
+        Args:
+            output (bytes): Raw device lines, without any header.
             
-            return devices
-        except subprocess.SubprocessError:
-            # Log the error and return empty list
-            return []
+        Returns:
+            tuple: Device dictionaries with details, shared between callers.
+        """
+        devices = []
+        for line in output.decode('utf-8', 'replace').splitlines():
+            if not line.strip():  # Skip empty lines
+                continue
+            serial, state, *properties = line.split()
+            device_info = {
+                "serial": serial,
+                "state": state
+            }
+            # Parse additional key:value properties directly into top level
+            device_info.update(part.partition(':')[::2] for part in properties if ':' in part)
+            devices.append(device_info)
+        
+        return tuple(devices)
 
 def main():
     """Run the ADBStatus command-line utility."""
@@ -93,7 +220,7 @@ def main():
                         print(f"    {key}: {value}")
     else:
         # JSON output (default)
-        print(json.dumps(devices, indent=2))
+        print_json(devices)
     
     return 0  # Success exit code
 
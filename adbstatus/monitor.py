@@ -1,18 +1,48 @@
 #!/usr/bin/env python3
 """ADBStatusMonitor - Monitor for ADB device connections and sleep/wake events."""
 
-import json
+import functools
 import logging
 import os
+import selectors
+import shlex
+import signal
 import subprocess
 import sys
+import threading
 import time
-from typing import Dict, Any, Optional, List, Set, Callable, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, List, Callable, Union
 from . import version_info
-from .core import ADBStatus
+from .core import ADBStatus, print_json, subprocess_env
 from .service import ADBStatusService
 from .sleep_monitor import ADBStatusSleepMonitor
 
+# Sentinel for device properties that are not present
+_MISSING = object()
+
+# Pending device update that requests a full check_devices()
+_FULL_CHECK = object()
+
+# State adb reports for a device that is online and ready for commands
+ONLINE_STATE = 'device'
+
+# Seconds between full device checks, in case a tracked change was missed
+RECONCILE_INTERVAL = 60
+
+# Flag each interpreter a script's shebang line can name takes an inline
+# script with, keyed by name without any version suffix
+_INTERPRETER_FLAGS = {
+    'sh': '-c', 'bash': '-c', 'dash': '-c', 'ksh': '-c', 'zsh': '-c',
+    'python': '-c', 'perl': '-e', 'ruby': '-e', 'node': '-e',
+}
+
+# Seconds a device script may run before it is killed
+SCRIPT_TIMEOUT = 60
+
+# Upper bound on scripts run at once, to avoid a fork storm on wake
+MAX_SCRIPT_WORKERS = 16
+
 class ADBStatusMonitor(ADBStatusService):
     """ADB Monitor to handle device connections and sleep/wake events."""
     
@@ -25,15 +55,22 @@ class ADBStatusMonitor(ADBStatusService):
             logger (logging.Logger, optional): Logger instance.
         """
         super().__init__('monitor', config_path, logger)
-        self.known_devices: Set[str] = set()
+        self.known_devices: Dict[str, Dict[str, str]] = {}
+        self._stop_r: Optional[int] = None
+        self._stop_w: Optional[int] = None
+        self._update_cond = threading.Condition()
+        self._pending_update: Any = None
+        self._pending_events: List[Callable[[], None]] = []
+        self._pool: Optional[ThreadPoolExecutor] = None
         
         # Initialize sleep monitor if enabled
         sleep_config = self.config.get('sleep_monitor', {})
         if sleep_config.get('enabled', True):
             self._sleep_monitor = ADBStatusSleepMonitor(
-                sleep_callback=self._handle_sleep,
-                wake_callback=self._handle_wake,
-                pid_file=os.path.expanduser(sleep_config.get('pid_file', '~/.adbstatus_sleepwatcher.pid'))
+                sleep_callback=functools.partial(self._queue_event, self._handle_sleep),
+                wake_callback=functools.partial(self._queue_event, self._handle_wake),
+                pid_file=os.path.expanduser(sleep_config.get('pid_file', '~/.adbstatus_sleepwatcher.pid')),
+                logger=self.logger
             )
         else:
             self.logger.info("Sleep monitor is disabled in configuration")
@@ -51,13 +88,16 @@ class ADBStatusMonitor(ADBStatusService):
         # Get base configuration
         config = super().load_config(config_path)
         
+        # Matches are only valid for the configuration they were made against
+        self._match_cache: Dict[tuple, List[Dict[str, Any]]] = {}
+        
         # Add monitor-specific defaults
         monitor_defaults = {
-            'check_interval': 5,
             'sleep_monitor': {
                 'enabled': True,
                 'pid_file': '~/.adbstatus_sleepwatcher.pid'
             },
+            'script_timeout': SCRIPT_TIMEOUT,
             'devices': []
         }
         
@@ -66,40 +106,94 @@ class ADBStatusMonitor(ADBStatusService):
             if k not in config:
                 config[k] = v
         
+        # Precompile each device filter into a tuple of (key, value) pairs
+        for device_config in config['devices'] or []:
+            match_items = tuple((device_config.get('device') or {}).items())
+            device_config['_match_items'] = match_items
+            device_config['_match_empty'] = not match_items
+        
+        # Properties any filter looks at, which are all that matches depend on
+        self._match_keys = tuple(sorted({
+            key for device_config in config['devices'] or []
+            for key, _ in device_config['_match_items']
+        }))
+        
         return config
     
     def get_matching_configs(self, device: Dict[str, str]) -> List[Dict[str, Any]]:
         """Get device configurations that match the given device.
         
+        Results are memoized by the values of the properties the filters look
+        at. Other properties, such as the transport ID that changes on every
+        reconnect, are left out so the cache only grows with distinct values
+        that can change a match. The cache is reset when the configuration is
+        reloaded.
+        
         Args:
             device (dict): Device information dictionary.
             
         Returns:
             list: List of matching configurations.
         """
-        config_list = self.config.get('devices', [])
-        matches = []
+        key = tuple(device.get(name, _MISSING) for name in self._match_keys)
+        matches = self._match_cache.get(key)
+        if matches is None:
+            matches = self._match_cache[key] = self._find_matching_configs(device)
+        return matches
+    
+    def _find_matching_configs(self, device: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Scan the device configurations for those matching the given device.
         
-        for config in config_list:
-            device_config = config.get('device', {})
-            if not device_config:  # Empty device config matches all devices
-                matches.append(config)
-                continue
-                
-            # Check if all criteria match
-            match = True
-            for key, value in device_config.items():
-                if key not in device or device[key] != value:
-                    match = False
-                    break
+        Args:
+            device (dict): Device information dictionary.
             
-            if match:
+        Returns:
+            list: List of matching configurations.
+        """
+        matches = []
+        
+        for config in self.config['devices'] or []:
+            # Empty device config matches all devices, otherwise all criteria must match
+            if config['_match_empty'] or all(
+                device.get(key, _MISSING) == value for key, value in config['_match_items']
+            ):
                 matches.append(config)
         
         return matches
     
+    @staticmethod
+    def _script_command(script):
+        """Build the command used to run a configured script.
+        
+        Scripts with a shebang line are run by its interpreter, passing the
+        rest of the script with the interpreter's inline script flag (such
+        as ``python3 -c``). Scripts without one are run with ``bash -c``.
+        Either way the script is passed as an argument, without writing it to
+        a temporary file, and stdin stays free for the script's own commands.
+        
+        Args:
+            script (str): Script body from the configuration.
+            
+        Returns:
+            list: Command list, or None if the shebang names an interpreter
+            that can't be given an inline script.
+        """
+        if not script.startswith('#!'):
+            return ['bash', '-c', script]
+        
+        shebang, _, body = script.partition('\n')
+        interpreter = shlex.split(shebang[2:])
+        # Skip over env and its options to the interpreter's own name
+        name = next((os.path.basename(arg) for arg in interpreter
+                     if os.path.basename(arg) != 'env' and not arg.startswith('-')), '')
+        flag = _INTERPRETER_FLAGS.get(name.rstrip('0123456789.'))
+        return [*interpreter, flag, body] if flag else None
+    
     def run_unique_scripts(self, device_id, configs, action_type):
-        """Run scripts for a specific action type, avoiding duplicates.
+        """Start scripts for a specific action type, avoiding duplicates.
+        
+        Scripts are submitted to the monitor's thread pool so that scripts for
+        different configs and devices run concurrently.
         
         Args:
             device_id (str): Device serial number.
@@ -107,10 +201,10 @@ class ADBStatusMonitor(ADBStatusService):
             action_type (str): Type of action ('connect', 'disconnect', 'sleep', 'wake').
             
         Returns:
-            list: List of results.
+            list: List of futures, each resolving to a result message.
         """
         seen_scripts = set()
-        results = []
+        futures = []
         
         for config in configs:
             script = config.get(action_type)
@@ -118,82 +212,323 @@ class ADBStatusMonitor(ADBStatusService):
                 continue
                 
             seen_scripts.add(script)
+            futures.append(self._pool.submit(self._run_script, device_id, script, action_type))
+        
+        return futures
+    
+    def _run_script(self, device_id, script, action_type):
+        """Run a single script for a device.
+        
+        The script runs in its own process group, so that if it runs for
+        longer than the script_timeout setting, it is killed along with any
+        commands it started.
+        
+        Args:
+            device_id (str): Device serial number.
+            script (str): Script body from the configuration.
+            action_type (str): Type of action the script belongs to.
             
-            # Execute script
-            env = os.environ.copy()
-            env['ANDROID_SERIAL'] = device_id
-            
-            try:
-                result = subprocess.run(
-                    ['bash', '-c', script],
-                    env=env,
-                    capture_output=True,
-                    text=True
-                )
-                if result.returncode == 0:
-                    results.append(f"{action_type} action successful")
-                else:
-                    results.append(f"{action_type} action failed: {result.stderr.strip()}")
-            except Exception as e:
-                results.append(f"{action_type} action error: {e}")
+        Returns:
+            str: Result message.
+        """
+        command = self._script_command(script)
+        if command is None:
+            shebang = script.partition('\n')[0]
+            self.logger.error(f"Unsupported shebang in {action_type} script, not running it: {shebang}")
+            return f"{action_type} action error: unsupported shebang {shebang}"
+        
+        timeout = self.config.get('script_timeout')
+        try:
+            with subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                env=subprocess_env(device_id),
+                # Only stderr is reported, so don't read stdout through a pipe
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True
+            ) as process:
+                try:
+                    _, stderr = process.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    process.wait()
+                    return f"{action_type} action timed out after {timeout}s"
+            if process.returncode == 0:
+                return f"{action_type} action successful"
+            return f"{action_type} action failed: {stderr.strip()}"
+        except Exception as e:
+            return f"{action_type} action error: {e}"
+    
+    def _log_results(self, futures):
+        """Log script results as they complete.
         
-        return results
+        Args:
+            futures (dict): Mapping of script futures to device serial numbers.
+        """
+        for future in as_completed(futures):
+            self.logger.info("  → %s: %s", futures[future], future.result())
+    
+    def _run_device_scripts(self, *actions):
+        """Run device scripts for one or more actions concurrently.
+        
+        All scripts are submitted before any are waited on, so total wall time
+        is that of the slowest script rather than the sum of all of them.
+        
+        Args:
+            *actions: Pairs of (devices, action_type), where devices is a list
+                of device information dictionaries.
+        """
+        futures = {}
+        for devices, action_type in actions:
+            for device in devices:
+                matching_configs = self.get_matching_configs(device)
+                for future in self.run_unique_scripts(device['serial'], matching_configs, action_type):
+                    futures[future] = device['serial']
+        self._log_results(futures)
     
     def _handle_sleep(self):
         """Handle sleep event."""
-        self.logger.info("System going to sleep")
-        devices = ADBStatus.get_devices()
-        for device in devices:
-            matching_configs = self.get_matching_configs(device)
-            results = self.run_unique_scripts(device['serial'], matching_configs, 'sleep')
-            for result in results:
-                self.logger.info(f"  → {device['serial']}: {result}")
+        self._run_device_scripts((ADBStatus.get_devices(), 'sleep'))
 
     def _handle_wake(self):
         """Handle wake event."""
-        self.logger.info("System waking up")
-        devices = ADBStatus.get_devices()
-        for device in devices:
-            matching_configs = self.get_matching_configs(device)
-            results = self.run_unique_scripts(device['serial'], matching_configs, 'wake')
-            for result in results:
-                self.logger.info(f"  → {device['serial']}: {result}")
+        self._run_device_scripts((ADBStatus.get_devices(), 'wake'))
 
     def check_devices(self):
         """Check for connected/disconnected devices and run appropriate actions."""
-        current_devices = set()
+        self._update_devices({
+            device['serial']: device for device in ADBStatus.get_devices()
+            if device['state'] == ONLINE_STATE
+        })
+    
+    def _apply_device_states(self, states):
+        """Apply a device list reported by ``adb track-devices``.
         
-        # Get current devices
-        for device in ADBStatus.get_devices():
-            serial = device['serial']
-            current_devices.add(serial)
-            
-            # Handle new devices
+        Only devices in the online state count as connected, since adb only
+        reports a device's model and other details once it is online. Devices
+        that came online since the last update are looked up with ``adb
+        devices -l``; others reuse the details stored when they came online.
+        A device that goes offline is disconnected, so its details are looked
+        up again when it comes back.
+        
+        Args:
+            states (dict): Mapping of device serial numbers to their states.
+        """
+        online = [serial for serial, state in states.items() if state == ONLINE_STATE]
+        
+        details = {}
+        if any(serial not in self.known_devices for serial in online):
+            details = {device['serial']: device for device in ADBStatus.get_devices()}
+        
+        self._update_devices({
+            serial: self.known_devices.get(serial) or details.get(serial)
+                    or {'serial': serial, 'state': ONLINE_STATE}
+            for serial in online
+        })
+    
+    def _update_devices(self, current_devices):
+        """Run connect/disconnect actions for changes to the set of devices.
+        
+        Args:
+            current_devices (dict): Mapping of serial numbers to device details
+                for all currently connected devices.
+        """
+        connected = []
+        for serial, device in current_devices.items():
             if serial not in self.known_devices:
-                self.logger.info(f"Device connected: {serial}")
-                matching_configs = self.get_matching_configs(device)
-                results = self.run_unique_scripts(serial, matching_configs, 'connect')
-                for result in results:
-                    self.logger.info(f"  → {serial}: {result}")
-        
-        # Handle disconnected devices
-        for serial in self.known_devices - current_devices:
-            self.logger.info(f"Device disconnected: {serial}")
-            # We can't get device details for disconnected devices, so just use serial
-            device_info = {'serial': serial}
-            matching_configs = self.get_matching_configs(device_info)
-            results = self.run_unique_scripts(serial, matching_configs, 'disconnect')
-            for result in results:
-                self.logger.info(f"  → {serial}: {result}")
+                self.logger.info("Device connected: %s", serial)
+                connected.append(device)
+        
+        disconnected = []
+        for serial, device in self.known_devices.items():
+            if serial not in current_devices:
+                self.logger.info("Device disconnected: %s", serial)
+                disconnected.append(device)
+        
+        # Run connect and disconnect scripts together
+        self._run_device_scripts((connected, 'connect'), (disconnected, 'disconnect'))
         
         # Update known devices
         self.known_devices = current_devices
 
+    def _queue_device_update(self, states=None):
+        """Hand a device update to the updater thread.
+        
+        Each update describes every device, so a newer update replaces any
+        that the updater hasn't picked up yet.
+        
+        Args:
+            states (dict, optional): Device states reported by track-devices,
+                or None for a full check_devices().
+        """
+        with self._update_cond:
+            self._pending_update = _FULL_CHECK if states is None else states
+            self._update_cond.notify()
+    
+    def _queue_event(self, handler):
+        """Hand a sleep/wake event to the updater thread.
+        
+        Unlike device updates, every event is kept and handled in order.
+        
+        Args:
+            handler (callable): Event handler to call, such as _handle_sleep.
+        """
+        with self._update_cond:
+            self._pending_events.append(handler)
+            self._update_cond.notify()
+    
+    def _device_updater(self):
+        """Apply queued device updates and sleep/wake events until the monitor stops.
+        
+        Running updates here keeps adb queries and device scripts off the
+        tracking loop, so it stays responsive to adb and to stop().
+        """
+        while True:
+            with self._update_cond:
+                while self._pending_update is None and not self._pending_events and self.running:
+                    self._update_cond.wait()
+                if not self.running:
+                    return
+                events, self._pending_events = self._pending_events, []
+                update, self._pending_update = self._pending_update, None
+            
+            for handler in events:
+                if not self.running:
+                    return  # Don't start scripts for events queued before stop()
+                try:
+                    handler()
+                except Exception as e:
+                    self.logger.error(f"Error handling sleep/wake event: {e}")
+            
+            if update is None:
+                continue
+            try:
+                if update is _FULL_CHECK:
+                    self.check_devices()
+                else:
+                    self._apply_device_states(update)
+            except Exception as e:
+                self.logger.error(f"Error updating devices: {e}")
+    
+    def _track_devices(self):
+        """Queue a device update each time adb reports a change to the device list.
+
+        Rather than polling ``adb devices -l``, this keeps an ``adb track-devices``
+        process open and blocks until it emits an update. Each update is a
+        length-prefixed frame (4 hex digits followed by the device list), so
+        frames are parsed from a raw byte buffer instead of by line. Only the
+        latest frame matters, since each one lists every device and its state.
+        A full check_devices() is queued every RECONCILE_INTERVAL seconds as a
+        safety net. If adb exits (for instance when a wake script restarts the
+        adb server) it is respawned after a short delay. Sleep/wake events are
+        read in this same loop and handed to the updater thread.
+        
+        Returns:
+            bool: True once stopped, or False if adb track-devices couldn't be
+            started.
+        """
+        with selectors.DefaultSelector() as selector:
+            # The stop pipe stays registered throughout, so stop() always wakes us
+            selector.register(self._stop_r, selectors.EVENT_READ)
+            
+            # As does sleepwatcher's output, when the sleep monitor is running
+            sleep_fd = self._sleep_monitor.fileno() if self._sleep_monitor else None
+            if sleep_fd is not None:
+                selector.register(sleep_fd, selectors.EVENT_READ)
+            
+            def select(timeout):
+                """Wait for the stop pipe or adb, reading sleep/wake events meanwhile."""
+                nonlocal sleep_fd
+                deadline = time.monotonic() + timeout
+                while True:
+                    ready = {key.fd for key, _ in selector.select(timeout=max(0, deadline - time.monotonic()))}
+                    if sleep_fd not in ready or self._stop_r in ready:
+                        return ready
+                    ready.discard(sleep_fd)
+                    if not self._sleep_monitor.read_events():
+                        self.logger.warning("sleepwatcher exited, sleep/wake events will not be monitored")
+                        selector.unregister(sleep_fd)
+                        sleep_fd = None
+                    if ready:
+                        return ready
+            
+            while self.running:
+                try:
+                    track = subprocess.Popen(
+                        ['adb', 'track-devices'],
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL,
+                        bufsize=0
+                    )
+                except OSError as e:
+                    self.logger.error(f"Could not start adb track-devices: {e}")
+                    return False
+                
+                track_fd = track.stdout.fileno()
+                selector.register(track_fd, selectors.EVENT_READ)
+                buffer = b''
+                try:
+                    # Pick up any changes made while adb was not being tracked
+                    self._queue_device_update()
+                    
+                    while self.running:
+                        ready = select(RECONCILE_INTERVAL)
+                        if self._stop_r in ready:
+                            return True
+                        if not ready:
+                            self._queue_device_update()
+                            continue
+                        
+                        chunk = os.read(track_fd, 4096)
+                        if not chunk:
+                            self.logger.warning("adb track-devices exited, restarting")
+                            break
+                        buffer += chunk
+                        
+                        # Consume all complete frames, keeping the latest one
+                        frame = None
+                        while len(buffer) >= 4:
+                            try:
+                                length = int(buffer[:4], 16)
+                            except ValueError:
+                                # Out of sync with adb, fall back to a full check
+                                buffer = b''
+                                frame = None
+                                self._queue_device_update()
+                                break
+                            if len(buffer) < 4 + length:
+                                break
+                            frame = buffer[4:4 + length]
+                            buffer = buffer[4 + length:]
+                        
+                        if frame is not None:
+                            states = {}
+                            for line in frame.decode('utf-8', 'replace').splitlines():
+                                serial, _, state = line.partition('\t')
+                                if serial:
+                                    states[serial] = state
+                            self._queue_device_update(states)
+                finally:
+                    selector.unregister(track_fd)
+                    track.terminate()
+                    track.wait()
+                    track.stdout.close()
+                
+                # Wait before respawning, waking immediately if stopped
+                if select(1.0):
+                    return True
+
     def _run_service(self):
         """Run the monitoring service."""
         try:
             # Start sleep monitor if available
-            if self._sleep_monitor and not self._sleep_monitor.start():
+            # Its events are read by the device tracking loop
+            if self._sleep_monitor and not self._sleep_monitor.start(threaded=False):
                 self.logger.warning("Sleep monitor could not be started. Sleep/wake events will not be monitored.")
                 self.logger.warning("Make sure sleepwatcher is installed: brew install sleepwatcher")
             
@@ -202,23 +537,46 @@ class ADBStatusMonitor(ADBStatusService):
             self.start_time = time.time()
             self.logger.info("ADB Monitor started")
             
+            # Scripts are run on a pool that lasts as long as this run, so the
+            # service can be started again after it is stopped
+            self._pool = ThreadPoolExecutor(max_workers=MAX_SCRIPT_WORKERS,
+                                            thread_name_prefix='adbstatus-script')
+            
+            # Self-pipe used by stop() to wake the device tracking loop
+            self._stop_r, self._stop_w = os.pipe()
+            
+            # Device updates and sleep/wake events are handled on their own
+            # thread, starting afresh from any left over by a previous run
+            self._pending_update = None
+            self._pending_events = []
+            updater = threading.Thread(target=self._device_updater, daemon=True)
+            updater.start()
+            
             # Run the monitoring loop
             try:
-                check_interval = self.config.get('check_interval', 5)
-                
-                while self.running:
-                    self.check_devices()
-                    time.sleep(check_interval)
+                result = self._track_devices()
             except KeyboardInterrupt:
                 self.logger.info("Shutting down ADB Monitor")
+                result = True
             finally:
                 # Stop sleep monitor if it was started
                 if self._sleep_monitor:
                     self._sleep_monitor.stop()
+                
+                os.close(self._stop_r)
+                os.close(self._stop_w)
+                self._stop_r = self._stop_w = None
+                
+                # Stop the updater, letting any update in progress finish
+                with self._update_cond:
+                    self.running = False
+                    self._update_cond.notify()
+                updater.join()
+                
+                # Let any scripts still running finish
+                self._pool.shutdown(wait=True)
             
-            self.running = False
-            
-            return True
+            return result
         except Exception as e:
             self.logger.error(f"Error starting monitor: {e}")
             return False
@@ -229,12 +587,13 @@ class ADBStatusMonitor(ADBStatusService):
         Returns:
             bool: True if monitor stopped successfully, False otherwise.
         """
-        # Stop sleep monitor if it exists
-        if self._sleep_monitor:
-            self._sleep_monitor.stop()
+        # Call parent stop method, then wake the device tracking loop, which
+        # stops the sleep monitor once it no longer reads its events
+        stopped = super().stop()
+        if self._stop_w is not None:
+            os.write(self._stop_w, b'x')
         
-        # Call parent stop method
-        return super().stop()
+        return stopped
     
     def get_status(self):
         """Get current monitor status.
@@ -281,7 +640,7 @@ def main():
             status = {"success": success}
             if not success:
                 status["error"] = "Failed to start monitor"
-            print(json.dumps(status, indent=2))
+            print_json(status)
             return 0 if success else 1  # Return appropriate exit code
     
     elif args.command == 'stop':
@@ -292,13 +651,13 @@ def main():
             "success": success,
             "message": "Monitor stopped" if success else "No running monitor found"
         }
-        print(json.dumps(result, indent=2))
+        print_json(result)
         return 0 if success else 1  # Return appropriate exit code
     
     else:  # status command
         monitor = ADBStatusMonitor(args.config)
         status = monitor.get_status()
-        print(json.dumps(status, indent=2))
+        print_json(status)
         return 0 if status["running"] else 1  # Return appropriate exit code
 
 
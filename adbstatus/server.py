@@ -1,52 +1,186 @@
 #!/usr/bin/env python3
 """ADBStatusServer - HTTP server for ADB device status information."""
 
-import argparse
-import json
 import logging
 import os
-import psutil
-import signal
 import ssl
 import sys
 import time
-import yaml
 import http.server
-import socketserver
 import threading
-from typing import Dict, Any, Optional, List, Tuple, Type, ClassVar, Union
+import urllib.parse
+from typing import Dict, Any, Optional, List, Tuple, Union
 from . import version_info
-from .core import ADBStatus
+from .core import ADBStatus, json_dumps, print_json
 from .service import ADBStatusService
 
+# Default seconds a device listing is shared between requests (cache_ttl setting)
+DEVICE_CACHE_TTL = 1.0
+
+# Seconds an idle keep-alive connection (and its thread) is kept open
+KEEPALIVE_TIMEOUT = 30
+
+# Latest (time, devices, index, body) snapshot, replaced as a whole on refresh
+# so it can be read without taking the lock
+_device_cache: Optional[Tuple[float, List[Dict[str, str]], Dict[str, Dict[str, List[Dict[str, str]]]], bytes]] = None
+_device_cache_lock = threading.Lock()
+
+def _index_devices(devices: List[Dict[str, str]]) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """Index devices by field name and case-folded field value.
+    
+    Args:
+        devices (list): List of device dictionaries.
+    
+    Returns:
+        dict: Mapping of field -> case-folded value -> list of matching devices.
+    """
+    index: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
+    for device in devices:
+        for field, value in device.items():
+            index.setdefault(field, {}).setdefault(value.casefold(), []).append(device)
+    return index
+
+def _encode_devices(devices: List[Dict[str, str]]) -> bytes:
+    """Encode a device list as a JSON response body.
+    
+    Args:
+        devices (list): List of device dictionaries.
+    
+    Returns:
+        bytes: Encoded response body.
+    """
+    return json_dumps({'devices': devices, 'count': len(devices)}, indent=True)
+
+def _get_cached_devices(ttl: float = DEVICE_CACHE_TTL) -> Tuple[List[Dict[str, str]], Dict[str, Dict[str, List[Dict[str, str]]]], bytes]:
+    """Get connected devices, reusing a recent result when one is available.
+    
+    Requests arriving within ttl seconds of each other share a single adb
+    query instead of each forking their own adb process. The field index
+    used by filter requests, and the encoded body for the full listing, are
+    built once per refresh.
+    
+    Fresh results are returned without locking. When a refresh is needed,
+    only one thread queries adb; requests arriving meanwhile wait for the
+    lock and then reuse its result.
+    
+    Args:
+        ttl (float): Maximum age in seconds of a reused device listing.
+    
+    Returns:
+        tuple: List of device dictionaries, their field index and the encoded
+        response body listing all of them.
+    """
+    global _device_cache
+    
+    cache = _device_cache
+    if cache is not None and time.monotonic() - cache[0] <= ttl:
+        return cache[1:]
+    
+    with _device_cache_lock:
+        # Another thread may have refreshed while we waited for the lock
+        cache = _device_cache
+        if cache is None or time.monotonic() - cache[0] > ttl:
+            devices = ADBStatus.get_devices()
+            cache = (time.monotonic(), devices, _index_devices(devices), _encode_devices(devices))
+            _device_cache = cache
+        return cache[1:]
+
 class ADBStatusRequestHandler(http.server.BaseHTTPRequestHandler):
     """Handler for ADB Status HTTP requests."""
-  
-  def do_GET(self) -> None:
-    """Handle GET requests."""
-        if self.path == '/':
-      self.send_response(200)
-      self.send_header('Content-type', 'application/json')
-      self.end_headers()
-      
-            # Get device information
-            devices = ADBStatus.get_devices()
-            response = {
-                'devices': devices,
-                'count': len(devices)
-            }
-            
-            self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
-    else:
-      self.send_response(404)
-            self.send_header('Content-type', 'application/json')
-      self.end_headers()
-            self.wfile.write(json.dumps({'error': 'Not found'}).encode('utf-8'))
+    
+    # Keep connections open between requests from polling clients
+    protocol_version = 'HTTP/1.1'
+    
+    # Close idle keep-alive connections so they don't each hold a thread
+    timeout = KEEPALIVE_TIMEOUT
+    
+    # Headers and body are written separately, so with Nagle's algorithm the
+    # body would wait on the client's delayed ACK of the headers
+    disable_nagle_algorithm = True
+    
+    # Route handler method names, keyed by number of path segments. Handlers
+    # return the encoded response body, or None if nothing matched.
+    ROUTES = {
+        0: '_all_devices',
+        2: '_devices_by_field',
+    }
+
+    def handle(self) -> None:
+        """Complete the TLS handshake, if any, then handle requests.
+        
+        The handshake is done here rather than on accept, so it runs on this
+        connection's thread and under its timeout.
+        """
+        if isinstance(self.connection, ssl.SSLSocket):
+            try:
+                self.connection.do_handshake()
+            except TimeoutError as e:
+                self.log_error("Request timed out: %r", e)
+                return
+            except OSError as e:
+                self.log_error("TLS handshake failed: %s", e)
+                return
+        super().handle()
+
+    def do_GET(self) -> None:
+        """Handle GET requests by dispatching on the path's segment count."""
+        path = urllib.parse.urlsplit(self.path).path.strip('/')
+        parts = [urllib.parse.unquote(part) for part in path.split('/')] if path else []
+        
+        route = self.ROUTES.get(len(parts))
+        body = getattr(self, route)(*parts) if route else None
+        
+        if body is not None:
+            self._send_json(200, body)
+        else:
+            self._send_json(404, json_dumps({'error': 'Not found'}))
+    
+    def _all_devices(self) -> bytes:
+        """Route ``/``: list all devices, reusing the body encoded on refresh."""
+        _, _, body = _get_cached_devices(self.server.cache_ttl)
+        return body
+    
+    def _devices_by_field(self, field: str, value: str) -> Optional[bytes]:
+        """Route ``/<field>/<value>``: list devices whose field matches, ignoring case."""
+        _, index, _ = _get_cached_devices(self.server.cache_ttl)
+        devices = index.get(field, {}).get(value.casefold())
+        return _encode_devices(devices) if devices is not None else None
+    
+    def _send_json(self, code: int, body: bytes) -> None:
+        """Send a JSON response.
+        
+        Content-Length is always sent so HTTP/1.1 clients can reuse the
+        connection for their next request.
+        
+        Args:
+            code (int): HTTP status code.
+            body (bytes): Encoded JSON response body.
+        """
+        self.send_response(code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
     
     def log_request(self, code: Union[int, str] = '-', size: Union[int, str] = '-') -> None:
         """Log HTTP requests."""
         if hasattr(self.server, 'logger'):
             self.server.logger.info(f"{self.client_address[0]} - {self.command} {self.path} {code}")
+    
+    def log_error(self, format: str, *args: Any) -> None:
+        """Log handler errors, with idle keep-alive timeouts at debug level."""
+        if hasattr(self.server, 'logger'):
+            level = logging.DEBUG if format.startswith('Request timed out') else logging.ERROR
+            self.server.logger.log(level, f"{self.client_address[0]} - {format % args}")
+
+
+class ADBStatusHTTPServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server whose port can be shared by several processes."""
+    
+    allow_reuse_port = True
+    
+    # Seconds device listings are cached for, set from the cache_ttl setting
+    cache_ttl = DEVICE_CACHE_TTL
 
 
 class ADBStatusServer(ADBStatusService):
@@ -57,17 +191,19 @@ class ADBStatusServer(ADBStatusService):
         """Initialize the server with the given configuration."""
         super().__init__('server', config_path, logger)
         self.httpd = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self._stop_event = threading.Event()
     
     def load_config(self, config_path: Optional[str] = None) -> Dict[str, Any]:
         """Load server configuration from YAML file.
         
         Loads base configuration using the parent class method, then
         adds server-specific defaults.
-  
-  Args:
+
+        Args:
             config_path (str, optional): Path to configuration file.
-  
-  Returns:
+
+        Returns:
             dict: Server configuration.
         """
         # Get base configuration
@@ -92,6 +228,7 @@ class ADBStatusServer(ADBStatusService):
         server_defaults = {
             'port': 8999,
             'bind_address': '0.0.0.0',
+            'cache_ttl': DEVICE_CACHE_TTL,
             'ssl': {
                 'enabled': True,
                 'cert_file': f'{ssl_dir}/adbstatus.crt',
@@ -113,50 +250,44 @@ class ADBStatusServer(ADBStatusService):
             bind_address = self.config.get('bind_address', '0.0.0.0')
             
             # Create server
-            class ThreadedHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
-                pass
-            
-            self.httpd = ThreadedHTTPServer((bind_address, port), ADBStatusRequestHandler)
+            self.httpd = ADBStatusHTTPServer((bind_address, port), ADBStatusRequestHandler)
             self.httpd.logger = self.logger
+            self.httpd.cache_ttl = float(self.config.get('cache_ttl', DEVICE_CACHE_TTL))
             
             # Configure SSL if enabled
-            ssl_config = self.config.get('ssl', {})
-            if ssl_config.get('enabled', True):
-                cert_file = os.path.expanduser(ssl_config.get('cert_file', '/usr/local/etc/adbstatus/ssl/adbstatus.crt'))
-                key_file = os.path.expanduser(ssl_config.get('key_file', '/usr/local/etc/adbstatus/ssl/adbstatus.key'))
-                
-                if os.path.exists(cert_file) and os.path.exists(key_file):
-  context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-                    context.load_cert_chain(cert_file, key_file)
-                    self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
-                    server_type = "HTTPS"
-                else:
-                    self.logger.warning(f"SSL certificate or key not found. Using HTTP instead.")
-                    server_type = "HTTP"
+            if self._ssl_context is None:
+                self._ssl_context = self._build_ssl_context()
+            if self._ssl_context:
+                # Handshakes are done by each connection's handler thread, so
+                # a slow client can't hold up accepting the others
+                self.httpd.socket = self._ssl_context.wrap_socket(
+                    self.httpd.socket, server_side=True, do_handshake_on_connect=False)
+                server_type = "HTTPS"
             else:
                 server_type = "HTTP"
             
             # Set running flags
+            self._stop_event.clear()
             self.running = True
             self.start_time = self.httpd.server_activate()
             
             self.logger.info(f"{server_type} server started on {bind_address}:{port}")
             
-            # Start server in a separate thread
+            # Start server in a separate thread; serve_forever waits on the
+            # listening socket with a poll-based selector where available
             server_thread = threading.Thread(target=self.httpd.serve_forever)
             server_thread.daemon = True
             server_thread.start()
             
-            # Wait for server thread or until stopped
+            # Wait until stopped, without waking up periodically to check
             try:
-                while self.running:
-                    server_thread.join(1.0)  # Check every second if we should stop
-  except KeyboardInterrupt:
+                self._stop_event.wait()
+            except KeyboardInterrupt:
                 self.logger.info("Shutting down server...")
             finally:
-                if self.httpd:
-                    self.httpd.shutdown()
-                    self.httpd.server_close()
+                self.httpd.shutdown()
+                self.httpd.server_close()
+                self.httpd = None
                 self.running = False
             
             return True
@@ -165,18 +296,41 @@ class ADBStatusServer(ADBStatusService):
             self.running = False
             return False
     
+    def _build_ssl_context(self) -> Optional[ssl.SSLContext]:
+        """Build the server's SSL context from the configuration.
+        
+        The context is built once, with the certificate chain loaded up front,
+        and shared by every connection. Session tickets are left enabled so
+        polling clients can resume sessions instead of repeating the full
+        handshake.
+        
+        Returns:
+            ssl.SSLContext: Configured context, or None if SSL is disabled or
+            the certificate or key is missing.
+        """
+        ssl_config = self.config.get('ssl', {})
+        if not ssl_config.get('enabled', True):
+            return None
+        
+        cert_file = os.path.expanduser(ssl_config.get('cert_file', '/usr/local/etc/adbstatus/ssl/adbstatus.crt'))
+        key_file = os.path.expanduser(ssl_config.get('key_file', '/usr/local/etc/adbstatus/ssl/adbstatus.key'))
+        if not (os.path.exists(cert_file) and os.path.exists(key_file)):
+            self.logger.warning("SSL certificate or key not found. Using HTTP instead.")
+            return None
+        
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.set_ciphers('ECDHE+AESGCM')  # TLS 1.2 only, TLS 1.3 suites are unaffected
+        context.options &= ~ssl.OP_NO_TICKET
+        context.load_cert_chain(cert_file, key_file)
+        return context
+    
     def stop(self):
         """Stop the HTTP server."""
         if self.httpd:
-            try:
-                self.httpd.shutdown()
-                self.httpd.server_close()
-                self.httpd = None
-                self.running = False
-                return True
-            except Exception as e:
-                self.logger.error(f"Error stopping server: {e}")
-                return False
+            # _run_service shuts the server down once it sees the event
+            self._stop_event.set()
+            return True
         else:
             return super().stop()
     
@@ -196,8 +350,6 @@ class ADBStatusServer(ADBStatusService):
 
 def main():
     """CLI entry point for the server."""
-    from . import version_info
-    
     # Parse arguments with program-specific settings
     args = ADBStatusService.parse_args(
         description='ADBStatus Server - HTTPS server for ADB device status',
@@ -215,15 +367,15 @@ def main():
         if success and args.foreground:
             # This will block until server is stopped
             pass
-      else:
+        else:
             # Output status as JSON
             status = {"success": success}
             if not success:
                 status["error"] = "Failed to start server"
-            print(json.dumps(status, indent=2))
+            print_json(status)
             return 0 if success else 1  # Return appropriate exit code
-  
-  elif args.command == 'stop':
+
+    elif args.command == 'stop':
         server = ADBStatusServer(args.config)
         success = server.stop()
         # Output status as JSON
@@ -231,13 +383,13 @@ def main():
             "success": success,
             "message": "Server stopped" if success else "No running server found"
         }
-        print(json.dumps(result, indent=2))
+        print_json(result)
         return 0 if success else 1  # Return appropriate exit code
     
     else:  # status command
         server = ADBStatusServer(args.config)
         status = server.get_status()
-        print(json.dumps(status, indent=2))
+        print_json(status)
         return 0 if status["running"] else 1  # Return appropriate exit code
 
 
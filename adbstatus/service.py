@@ -11,18 +11,48 @@ License: MIT
 """
 
 import argparse
+import atexit
+import functools
+import hashlib
 import json
 import logging
+import logging.handlers
 import os
-import psutil
+import pickle
+import queue
+import re
 import signal
 import subprocess
 import sys
+import threading
 import time
-import yaml
 from typing import Dict, Any, Optional, List, Tuple, Type, ClassVar, Union
 from . import version_info
 
+try:
+  import fcntl
+except ImportError:  # Not available on Windows, which isn't supported anyway
+  fcntl = None
+
+# Directory for parsed configuration caches
+CONFIG_CACHE_DIR = '~/Library/Caches/adbstatus'
+
+# Process name prefixes a running service can have: the Python interpreter,
+# or the console script itself on Linux
+_INSTANCE_PROCESS_NAMES = ('python', 'adbstatus')
+
+# Directories searched for {service_name}.yml, in order of precedence
+CONFIG_DIRS = (
+  # User-specific location in Homebrew prefix
+  '/usr/local/etc/adbstatus',
+  # Apple Silicon Mac Homebrew location
+  '/opt/homebrew/etc/adbstatus',
+  # Default fallback location
+  os.path.expanduser('~/Library/Application Support/adbstatus'),
+  # Package-relative location
+  os.path.join(os.path.dirname(__file__), "etc"),
+)
+
 class ADBStatusService:
   """Base class for ADB Status services.
   
@@ -36,6 +66,9 @@ class ADBStatusService:
   and ADBStatusMonitor.
   """
   
+  # Configuration file found for each service name, shared by all instances
+  _RESOLVED_CONFIG: ClassVar[Dict[str, str]] = {}
+  
   def __init__(self, service_name: str, config_path: Optional[str] = None, 
                logger: Optional[logging.Logger] = None) -> None:
     """Initialize the service with the given configuration.
@@ -46,10 +79,13 @@ class ADBStatusService:
         logger: Logger instance.
     """
     self.service_name = service_name
+    self._log_listener: Optional[logging.handlers.QueueListener] = None
     self.config = self.load_config(config_path)
     self.logger = logger or self.setup_logging(self.config)
     self.running = False
     self.start_time: Optional[float] = None
+    self._pid_file = os.path.expanduser(f'~/Library/Application Support/adbstatus/{service_name}.pid')
+    self._pid_fd = None  # Open, locked PID file while we're running
   
   def load_config(self, config_path: Optional[str] = None) -> Dict[str, Any]:
     """Load service configuration from YAML file.
@@ -72,27 +108,22 @@ class ADBStatusService:
     """
     # If a specific path was provided, use it directly
     if not config_path:
-      # Check common locations in order of precedence
-      possible_paths = [
-        # User-specific location in Homebrew prefix
-        f'/usr/local/etc/adbstatus/{self.service_name}.yml',
-        # Apple Silicon Mac Homebrew location
-        f'/opt/homebrew/etc/adbstatus/{self.service_name}.yml',
-        # Default fallback location
-        f'~/Library/Application Support/adbstatus/{self.service_name}.yml',
-        # Package-relative location
-        os.path.join(os.path.dirname(__file__), "etc", f"{self.service_name}.yml")
-      ]
-      
-      # Use the first config file that exists
-      for path in possible_paths:
-        expanded_path = os.path.expanduser(path)
-        if os.path.exists(expanded_path):
-          config_path = expanded_path
-          break
+      config_path = self._RESOLVED_CONFIG.get(self.service_name)
+    if not config_path:
+      # Use the first config file that exists in the common locations
+      file_name = f'{self.service_name}.yml'
+      for config_dir in CONFIG_DIRS:
+        path = os.path.join(config_dir, file_name)
+        try:
+          os.stat(path)
+        except OSError:
+          continue
+        config_path = path
+        self._RESOLVED_CONFIG[self.service_name] = config_path
+        break
       else:
         # Default to the first path if none exist (it will be created later if needed)
-        config_path = os.path.expanduser(possible_paths[0])
+        config_path = os.path.join(CONFIG_DIRS[0], file_name)
         # Log that we're using a default path that doesn't exist yet
         logging.info(f"No configuration file found, will use default settings (would save to {config_path})")
     
@@ -104,36 +135,87 @@ class ADBStatusService:
       }
     }
     
-    # Load configuration from file if it exists
-    if os.path.exists(config_path):
-      try:
-        with open(config_path, 'r') as f:
-          config = yaml.safe_load(f)
-        
-        # Merge with default config
-        if config:
-          # Handle nested dictionaries
-          for k, v in config.items():
-            if k in default_config and isinstance(default_config[k], dict) and isinstance(v, dict):
-              default_config[k].update(v)
-            else:
-              default_config[k] = v
-      except Exception as e:
-        logging.error(f"Error loading config from {config_path}: {e}")
-        logging.info("Using default configuration")
-    else:
+    # Load configuration from file if it exists. Reading it directly, rather
+    # than checking first, saves a stat() and can't race with its removal.
+    try:
+      config = self._read_config_file(config_path)
+      
+      # Merge with default config
+      if config:
+        # Handle nested dictionaries
+        for k, v in config.items():
+          if k in default_config and isinstance(default_config[k], dict) and isinstance(v, dict):
+            default_config[k].update(v)
+          else:
+            default_config[k] = v
+    except FileNotFoundError:
       logging.info(f"Configuration file {config_path} not found, using default settings")
       
       # Optionally create parent directories for the config file
       # Uncomment these lines if you want to create the directory structure for future use
       # config_dir = os.path.dirname(config_path)
       # os.makedirs(config_dir, exist_ok=True)
+    except Exception as e:
+      logging.error(f"Error loading config from {config_path}: {e}")
+      logging.info("Using default configuration")
     
     return default_config
   
+  def _read_config_file(self, config_path):
+    """Read a YAML configuration file, reusing a cached parse when possible.
+    
+    Parsed configurations are pickled to CONFIG_CACHE_DIR, keyed by the
+    file's path, modification time and size. Loading the pickle is much
+    faster than parsing YAML again on every command.
+    
+    Args:
+        config_path (str): Path to the configuration file.
+        
+    Returns:
+        Parsed configuration, or None if the file is empty.
+    """
+    config_path = os.path.abspath(config_path)
+    st = os.stat(config_path)
+    key = (config_path, st.st_mtime_ns, st.st_size)
+    cache_file = os.path.join(
+      os.path.expanduser(CONFIG_CACHE_DIR),
+      hashlib.sha1(config_path.encode('utf-8')).hexdigest() + '.pickle'
+    )
+    
+    # Use the cached parse if the file hasn't changed since it was made
+    try:
+      with open(cache_file, 'rb') as f:
+        cached_key, config = pickle.load(f)
+      if cached_key == key:
+        return config
+    except Exception:
+      pass  # Missing, stale or unreadable cache
+    
+    # Imported here so cached loads don't pay for importing PyYAML
+    import yaml
+    
+    # Use libyaml's C loader when PyYAML was built with it
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(config_path, 'rb') as f:
+      config = yaml.load(f, Loader=loader)
+    
+    try:
+      os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+      tmp_file = f'{cache_file}.{os.getpid()}'
+      with open(tmp_file, 'wb') as f:
+        pickle.dump((key, config), f, protocol=pickle.HIGHEST_PROTOCOL)
+      os.replace(tmp_file, cache_file)
+    except OSError as e:
+      logging.debug(f"Could not cache configuration {config_path}: {e}")
+    
+    return config
+  
   def setup_logging(self, config):
     """Set up logging based on configuration.
     
+    The logger only puts records on a queue. A QueueListener thread writes
+    them to the console and log file, so logging calls don't block on I/O.
+    
     Args:
         config (dict): Service configuration.
     
@@ -156,18 +238,38 @@ class ADBStatusService:
     # Create formatter
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     
-    # Add console handler
+    # Create console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
     
-    # Add file handler
+    # Create file handler
     file_handler = logging.FileHandler(log_file)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    
+    # Queue records for the listener thread, which owns the real handlers
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    self._stop_logging()
+    self._log_listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler)
+    self._log_listener.start()
+    
+    # Flush queued records on exit
+    atexit.register(self._stop_logging)
     
     return logger
   
+  def _stop_logging(self):
+    """Stop the log listener thread, after it writes any queued records.
+    
+    Returns:
+        logging.handlers.QueueListener: The stopped listener, or None if
+        none was running.
+    """
+    listener, self._log_listener = self._log_listener, None
+    if listener:
+      listener.stop()
+    return listener
+  
   def start(self, foreground=False):
     """Start the service.
     
@@ -188,7 +290,15 @@ class ADBStatusService:
         self.logger.error("Daemon mode only supported on POSIX systems")
         return False
         
-      if os.fork() == 0:
+      # Stop the log listener, which would not survive the fork, and restart
+      # it on both sides afterwards
+      listener = self._stop_logging()
+      pid = os.fork()
+      if listener:
+        listener.start()
+        self._log_listener = listener
+      
+      if pid == 0:
         # Child process
         # Detach from parent process
         os.setsid()
@@ -206,15 +316,114 @@ class ADBStatusService:
         os.dup2(0, 2) # stderr
         
         # Start service
-        self._run_service()
-        sys.exit(0)
+        sys.exit(0 if self._run_with_pid_file() else 1)
       else:
         # Parent process
         self.logger.info(f"{self.service_name} started in daemon mode")
         return True
     else:
       # Run in foreground
+      return self._run_with_pid_file()
+  
+  def _run_with_pid_file(self):
+    """Run the service, recording our PID in the PID file while it runs.
+    
+    SIGTERM is handled by stopping the service, so it shuts down cleanly
+    and removes its PID file when another instance asks it to stop. Signal
+    handlers can only be set from the main thread, so when the service is
+    run from another thread it is left to the caller to call stop().
+    
+    Returns:
+        bool: Result of _run_service, or False if another instance started
+        first.
+    """
+    if not self._write_pid_file():
+      self.logger.error(f"{self.service_name} is already running")
+      return False
+    previous_handler = None
+    try:
+      if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGTERM, self._handle_signal)
       return self._run_service()
+    finally:
+      if previous_handler is not None:
+        signal.signal(signal.SIGTERM, previous_handler)
+      self._remove_pid_file()
+  
+  def _handle_signal(self, signum, frame):
+    """Stop the service when a termination signal is received."""
+    self.logger.info(f"Received {signal.Signals(signum).name}")
+    self.stop()
+  
+  def _write_pid_file(self):
+    """Lock the PID file and record our PID in it.
+    
+    The lock is held for as long as we run, and the kernel releases it if
+    we exit without cleaning up. Of two instances starting at once only one
+    can take it, and a leftover PID file is simply locked again.
+    
+    Returns:
+        bool: False if another running instance holds the PID file.
+    """
+    try:
+      os.makedirs(os.path.dirname(self._pid_file), exist_ok=True)
+      fd = os.open(self._pid_file, os.O_CREAT | os.O_RDWR, 0o644)
+    except OSError as e:
+      self.logger.warning(f"Could not write PID file {self._pid_file}: {e}")
+      return True
+    if fcntl is not None:
+      try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+      except BlockingIOError:
+        os.close(fd)
+        return False
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, f"{os.getpid()}\n".encode(), 0)
+    self._pid_fd = fd
+    return True
+  
+  def _remove_pid_file(self):
+    """Empty the PID file and release its lock.
+    
+    The file is truncated rather than removed. Removing it would let another
+    instance create and lock a new file while one that opened the old file
+    can still lock that too.
+    """
+    if self._pid_fd is not None:
+      os.ftruncate(self._pid_fd, 0)
+      os.close(self._pid_fd)  # Releases the lock
+      self._pid_fd = None
+  
+  def _pid_file_process(self):
+    """Find the other running instance recorded in the PID file.
+    
+    A running instance holds a lock on its PID file, so a PID file that
+    can be locked is stale, whatever PID it records.
+    
+    Returns:
+        int: PID of the running instance, 0 if the PID file is stale (or
+        records this process), or None if there is no usable PID file.
+    """
+    try:
+      with open(self._pid_file, 'rb') as f:
+        if fcntl is not None:
+          try:
+            fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return 0
+          except BlockingIOError:
+            pass  # Locked by a running instance
+        pid = int(f.read().strip())
+    except (OSError, ValueError):
+      return None
+    if pid == os.getpid():
+      return 0
+    try:
+      os.kill(pid, 0)
+    except ProcessLookupError:
+      return 0
+    except PermissionError:
+      pass  # Process exists but belongs to another user
+    return pid
   
   def _run_service(self):
     """Internal method to run the service. To be implemented by subclasses."""
@@ -233,7 +442,7 @@ class ADBStatusService:
       return True
     else:
       # Stop other instances
-      stopped = self.stop_other_instances()
+      stopped = self.stop_other_instances(self._find_instances())
       if stopped:
         self.logger.info(f"Other {self.service_name} instances stopped")
       else:
@@ -243,36 +452,104 @@ class ADBStatusService:
   def is_running(self):
     """Check if this service is already running.
     
+    The PID file is checked first, and its process's command line is
+    checked in case the PID was reused after the service exited. All
+    processes are only scanned when there is no PID file, such as for
+    instances started before PID files were written.
+    
     Returns:
         bool: True if service is running, False otherwise.
     """
+    return bool(self._find_instances())
+  
+  def _find_instances(self):
+    """Find other running instances of this service.
+    
+    The process recorded in the PID file is used when there is one, after
+    checking its command line in case the PID was reused. Otherwise all
+    processes are scanned once.
+    
+    Returns:
+        list: psutil.Process for each other running instance.
+    """
+    # A stale PID file is detected with kill(0), so psutil isn't needed
+    pid = self._pid_file_process()
+    if pid == 0:
+      return []
+    
+    import psutil  # Imported here to keep CLI startup fast
+    
+    if pid is not None:
+      try:
+        proc = psutil.Process(pid)
+        if any('adbstatus' in arg for arg in proc.cmdline()):
+          return [proc]
+      except psutil.Error:
+        pass
+      return []
+    
+    # Services run as Python console scripts, so the process name is either
+    # the interpreter or the script. Only those processes' command lines,
+    # which are much more expensive to read than names, are checked.
+    search = self._cmdline_pattern(self.service_name).search
+    my_pid = os.getpid()
+    instances = []
     try:
-      for proc in psutil.process_iter(['pid', 'cmdline']):
-        if proc.info['cmdline'] and f'adbstatus-{self.service_name}' in ' '.join(proc.info['cmdline']) and proc.pid != os.getpid():
-          return True
-      return False
+      for proc in psutil.process_iter(['pid', 'name']):
+        info = proc.info
+        if info['pid'] == my_pid or not (info['name'] or '').lower().startswith(_INSTANCE_PROCESS_NAMES):
+          continue
+        try:
+          cmdline = proc.cmdline()
+        except psutil.Error:
+          continue
+        if any(search(arg) for arg in cmdline):
+          instances.append(proc)
     except Exception:
-      return False
+      return []
+    return instances
+  
+  @staticmethod
+  @functools.lru_cache(maxsize=None)
+  def _cmdline_pattern(service_name):
+    """Get the compiled pattern matching a service's command line arguments.
+    
+    Args:
+        service_name (str): Name of the service.
+        
+    Returns:
+        re.Pattern: Pattern matching adbstatus-<service_name> as a whole word.
+    """
+    return re.compile(rf'adbstatus-{re.escape(service_name)}\b')
   
-  def stop_other_instances(self):
+  def stop_other_instances(self, procs=None):
     """Stop any other running instances of this service.
     
+    Args:
+        procs (list, optional): Instances to stop, as found by _find_instances.
+        
     Returns:
         bool: True if any instances were stopped, False otherwise.
     """
-    try:
-      stopped = False
-      for proc in psutil.process_iter(['pid', 'cmdline']):
-        if proc.info['cmdline'] and f'adbstatus-{self.service_name}' in ' '.join(proc.info['cmdline']) and proc.pid != os.getpid():
-          proc.send_signal(signal.SIGTERM)
-          stopped = True
-          try:
-            proc.wait(timeout=2)
-          except psutil.TimeoutExpired:
-            proc.kill()  # Force kill if it doesn't terminate gracefully
-      return stopped
-    except Exception:
+    if procs is None:
+      procs = self._find_instances()
+    if not procs:
       return False
+    
+    import psutil  # Imported here to keep CLI startup fast
+    
+    stopped = False
+    for proc in procs:
+      try:
+        proc.send_signal(signal.SIGTERM)
+        stopped = True
+        try:
+          proc.wait(timeout=2)
+        except psutil.TimeoutExpired:
+          proc.kill()  # Force kill if it doesn't terminate gracefully
+      except psutil.Error:
+        pass  # Already exited
+    return stopped
   
   def get_status(self):
     """Get current service status. To be extended by subclasses.
@@ -4,10 +4,29 @@ from typing import Callable, Optional, Dict, Any
 import atexit
 import logging
 import os
+import selectors
+import shutil
 import subprocess
-import tempfile
 import threading
-import time
+
+try:
+  import fcntl
+except ImportError:  # Not available on Windows, which isn't supported anyway
+  fcntl = None
+
+# Commands sleepwatcher runs on sleep and wake. Their output is forwarded on
+# sleepwatcher's stdout, which we read to learn of each event.
+SLEEP_COMMAND = 'echo SLEEP'
+WAKE_COMMAND = 'echo WAKE'
+
+# Homebrew locations to look for sleepwatcher when it isn't in PATH, with
+# Apple Silicon first since sleepwatcher only runs on macOS
+_SLEEPWATCHER_FALLBACK_PATHS = (
+  '/opt/homebrew/sbin/sleepwatcher',
+  '/opt/homebrew/bin/sleepwatcher',
+  '/usr/local/sbin/sleepwatcher',
+  '/usr/local/bin/sleepwatcher',
+)
 
 class ADBStatusSleepMonitor:
   """Monitor sleep/wake events using sleepwatcher command-line tool.
@@ -32,79 +51,52 @@ class ADBStatusSleepMonitor:
     self._sleep_callback = sleep_callback
     self._wake_callback = wake_callback
     self._pid_file = os.path.expanduser(pid_file)
+    self._pid_fd = None  # Open, locked PID file while we're running
     self._logger = logger or logging.getLogger(__name__)
     self._process = None
     self._running = False
-    self._sleep_script = None
-    self._wake_script = None
-    self._output_thread = None  # Track the output monitoring thread
-    self._event_thread = None   # Track the event monitoring thread
-    self._event_dir = os.path.join(tempfile.gettempdir(), "adbstatus_events")
-    self._sleep_marker = os.path.join(self._event_dir, "sleep_event")
-    self._wake_marker = os.path.join(self._event_dir, "wake_event")
-    
-    # Create event directory
-    os.makedirs(self._event_dir, exist_ok=True)
-    
-    # Clean up any existing marker files
-    for file in [self._sleep_marker, self._wake_marker]:
-      if os.path.exists(file):
-        os.unlink(file)
+    self._output_thread = None  # Reads sleepwatcher output and dispatches events
+    self._wake_r = None  # Self-pipe used by stop() to wake the output thread
+    self._wake_w = None
+    self._buffer = b''  # Partial line of sleepwatcher output
 
-  def _is_already_running(self):
-    """Check if sleepwatcher is already running.
+  def _lock_pid_file(self):
+    """Open the PID file and take an exclusive lock on it.
+    
+    The lock is held for as long as we run, and the kernel releases it if
+    we exit without cleaning up. A leftover PID file from a crashed run is
+    therefore simply locked again, and there's no need to check whether
+    the PID recorded in it is still alive.
     
     Returns:
-      bool: True if sleepwatcher is already running.
+      bool: True if the lock was taken, False if another monitor holds it.
     """
-    # Check PID file
-    if os.path.exists(self._pid_file):
-      try:
-        with open(self._pid_file, 'r') as f:
-          pid = int(f.read().strip())
-        # Check if process is running
-        import psutil
-        if psutil.pid_exists(pid):
-          return True
-      except (ValueError, FileNotFoundError, psutil.NoSuchProcess):
-        # PID file exists but process is not running
-        pass
-    
-    return False
-
-  def _setup_scripts(self):
-    """Create temporary scripts for sleep/wake events."""
-    # Handle Windows platform differently
-    if os.name == 'nt':
-        self._logger.error("Windows is not supported for sleep monitoring")
-        return False
-        
-    # ... existing code for Unix systems
-
-  def _cleanup_scripts(self):
-    """Clean up temporary scripts."""
-    for script in [self._sleep_script, self._wake_script]:
-      if script and os.path.exists(script):
-        try:
-          os.unlink(script)
-        except:
-          pass
-    self._sleep_script = None
-    self._wake_script = None
+    fd = os.open(self._pid_file, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+      fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+      os.close(fd)
+      return False
+    self._pid_fd = fd
+    return True
 
   def _write_pid_file(self):
-    """Write PID file."""
-    if self._process:
-      with open(self._pid_file, 'w') as f:
-        f.write(str(self._process.pid))
+    """Write the sleepwatcher PID to the locked PID file."""
+    if self._process and self._pid_fd is not None:
+      os.ftruncate(self._pid_fd, 0)
+      os.pwrite(self._pid_fd, f"{self._process.pid}\n".encode(), 0)
 
   def _remove_pid_file(self):
-    """Remove PID file."""
-    if os.path.exists(self._pid_file):
-      try:
-        os.unlink(self._pid_file)
-      except:
-        pass
+    """Empty the PID file and release its lock.
+    
+    The file is truncated rather than removed. Removing it would let another
+    monitor create and lock a new file while one that opened the old file
+    can still lock that too.
+    """
+    if self._pid_fd is not None:
+      os.ftruncate(self._pid_fd, 0)
+      os.close(self._pid_fd)  # Releases the lock
+      self._pid_fd = None
 
   def _handle_sleep(self):
     """Handle sleep event."""
@@ -124,102 +116,135 @@ class ADBStatusSleepMonitor:
       except Exception as e:
         self._logger.error(f"Error in wake callback: {e}")
 
-  def _check_for_events(self):
-    """Check for event marker files."""
-    while self._running:
-      # Check for sleep event
-      if os.path.exists(self._sleep_marker):
-        os.unlink(self._sleep_marker)
+  def fileno(self) -> Optional[int]:
+    """Get the file descriptor sleepwatcher's output is read from.
+    
+    When started without a thread, register this with a selector and call
+    read_events() whenever it is ready.
+    
+    Returns:
+        int: File descriptor, or None if sleepwatcher isn't running.
+    """
+    return self._process.stdout.fileno() if self._process else None
+
+  def read_events(self) -> bool:
+    """Read available sleepwatcher output and handle any events in it.
+    
+    Returns:
+        bool: False once sleepwatcher has exited and closed its output.
+    """
+    data = os.read(self._process.stdout.fileno(), 4096)
+    if not data:
+      return False
+    
+    # Handle each complete line, keeping any partial line for later
+    *lines, self._buffer = (self._buffer + data).split(b'\n')
+    for line in lines:
+      token = line.strip()
+      if token == b'SLEEP':
         self._handle_sleep()
-      
-      # Check for wake event
-      if os.path.exists(self._wake_marker):
-        os.unlink(self._wake_marker)
+      elif token == b'WAKE':
         self._handle_wake()
+      elif self._logger.isEnabledFor(logging.DEBUG):
+        self._logger.debug(f"sleepwatcher: {token.decode('utf-8', 'replace')}")
+    return True
+
+  def _read_output(self):
+    """Read sleepwatcher's output, handling each event as it is printed.
+    
+    The thread blocks in the selector until sleepwatcher prints something,
+    so events are handled as soon as they happen without any polling. It
+    also wakes when stop() writes to the wake pipe, so it exits promptly
+    even if the output pipe is still held open.
+    """
+    with selectors.DefaultSelector() as selector:
+      selector.register(self.fileno(), selectors.EVENT_READ)
+      selector.register(self._wake_r, selectors.EVENT_READ)
+      while self._running:
+        if any(key.fd == self._wake_r for key, _ in selector.select()):
+          break
+        if not self.read_events():
+          break  # sleepwatcher exited
       
-      # Sleep briefly
-      time.sleep(0.5)
-      
-  def start(self) -> bool:
+  def start(self, threaded: bool = True) -> bool:
     """Start monitoring sleep/wake events.
     
+    Args:
+        threaded: Read events on a thread of our own. If False, the caller
+            must watch fileno() in its own event loop and call read_events().
+    
     Returns:
         bool: True if started successfully, False otherwise
     """
     if self._running:
       self._logger.info("Monitor already running")
       return False
+    
+    # Handle Windows platform differently
+    if os.name == 'nt':
+      self._logger.error("Windows is not supported for sleep monitoring")
+      return False
       
     # Check for existing sleepwatcher process
-    if self._is_already_running():
+    try:
+      locked = self._lock_pid_file()
+    except OSError as e:
+      self._logger.error(f"Could not open sleepwatcher PID file {self._pid_file}: {e}")
+      return False
+    if not locked:
       self._logger.error("Another instance of sleepwatcher is already running")
       return False
-      
-    # Check if sleepwatcher is installed
+    
     try:
+      # Check if sleepwatcher is installed
       # Try to find sleepwatcher in PATH first
-      try:
-        sleepwatcher_path = subprocess.check_output(['which', 'sleepwatcher'], 
-                                                  text=True, 
-                                                  stderr=subprocess.DEVNULL).strip()
-      except subprocess.CalledProcessError:
+      sleepwatcher_path = shutil.which('sleepwatcher')
+      if not sleepwatcher_path:
         # If not in PATH, try known Homebrew locations
-        for path in [
-          '/usr/local/sbin/sleepwatcher',
-          '/usr/local/bin/sleepwatcher',
-          '/opt/homebrew/bin/sleepwatcher'
-        ]:
-          if os.path.exists(path):
-            sleepwatcher_path = path
-            break
-        else:
-          raise FileNotFoundError("sleepwatcher executable not found")
+        sleepwatcher_path = next((path for path in _SLEEPWATCHER_FALLBACK_PATHS if os.path.isfile(path)), None)
+      if not sleepwatcher_path:
+        raise FileNotFoundError("sleepwatcher executable not found")
             
-      # Set up scripts
-      self._setup_scripts()
-      
       # Start sleepwatcher process
       cmd = [
         sleepwatcher_path,
-        '-s', self._sleep_script,
-        '-w', self._wake_script
+        '-s', SLEEP_COMMAND,
+        '-w', WAKE_COMMAND
       ]
       self._process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,  # Use text=True instead of universal_newlines=True (deprecated)
-        bufsize=1
+        bufsize=0,  # Read straight from the pipe, so the selector sees all output
+        close_fds=True,
+        start_new_session=True  # Ctrl-C is handled by us, and we stop it in turn
       )
       
       # Write PID file
       self._write_pid_file()
       
-      # Start thread to monitor process output
-      def monitor_output() -> None:
-        for line in self._process.stdout:
-          # Optionally log the output for debugging
-          self._logger.debug(f"sleepwatcher: {line.strip()}")
-          
-      self._output_thread = threading.Thread(target=monitor_output, daemon=True)
-      self._output_thread.start()
-      
-      # Start thread to check for event marker files
+      # Start the one thread that both reads the process output and
+      # dispatches the events found in it, unless the caller will
+      self._wake_r, self._wake_w = os.pipe()
+      self._buffer = b''
       self._running = True
-      self._event_thread = threading.Thread(target=self._check_for_events, daemon=True)
-      self._event_thread.start()
+      if threaded:
+        self._output_thread = threading.Thread(target=self._read_output,
+                                               name='adbstatus-sleepwatcher', daemon=True)
+        self._output_thread.start()
       
       # Register cleanup at exit
       atexit.register(self.stop)
       
       return True
       
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    except FileNotFoundError:
       self._logger.error("sleepwatcher not installed. Install with: brew install sleepwatcher")
+      self._remove_pid_file()
       return False
     except Exception as e:
       self._logger.error(f"Error starting sleepwatcher: {e}")
-      self._cleanup_scripts()
+      self._remove_pid_file()
       return False
   
   def stop(self) -> bool:
@@ -228,5 +253,29 @@ class ADBStatusSleepMonitor:
     Returns:
         bool: True if stopped successfully, False otherwise
     """
-    # Rest of method implementation...
-    # Be sure to set self._output_thread = None and self._event_thread = None when cleaned up 
\ No newline at end of file
+    if not self._running:
+      return False
+    self._running = False
+    
+    # Wake the output thread so it exits without waiting for the pipe to close
+    os.write(self._wake_w, b'x')
+    if self._output_thread and self._output_thread is not threading.current_thread():
+      self._output_thread.join(timeout=2)
+    self._output_thread = None
+    os.close(self._wake_r)
+    os.close(self._wake_w)
+    self._wake_r = self._wake_w = None
+    
+    # Stop the sleepwatcher process
+    if self._process:
+      self._process.terminate()
+      try:
+        self._process.wait(timeout=2)
+      except subprocess.TimeoutExpired:
+        self._process.kill()  # Force kill if it doesn't terminate gracefully
+        self._process.wait()
+      self._process.stdout.close()
+      self._process = None
+    
+    self._remove_pid_file()
+    return True